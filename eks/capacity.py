@@ -0,0 +1,164 @@
+import ipaddress
+import math
+import typing
+
+# AWS reserves the first four and the last IP address of every subnet
+RESERVED_IPS_PER_SUBNET = 5
+# EKS needs at least six free IPs in each control plane subnet for its cross account ENIs
+# See https://docs.aws.amazon.com/eks/latest/userguide/network_reqs.html
+EKS_CONTROL_PLANE_MIN_FREE_IPS = 6
+# Max pods EKS recommends for instance types with less than 30 vCPUs when using prefix delegation
+PREFIX_DELEGATION_MAX_PODS = 110
+IPS_PER_PREFIX = 16
+
+
+class InstanceNetworkLimits(typing.NamedTuple):
+    max_enis: int
+    ipv4_per_eni: int
+    nitro: bool
+
+
+# See https://docs.aws.amazon.com/AWSEC2/latest/UserGuide/using-eni.html#AvailableIpPerENI
+INSTANCE_NETWORK_LIMITS = {
+    "c4.large": InstanceNetworkLimits(max_enis=3, ipv4_per_eni=10, nitro=False),
+    "c5.large": InstanceNetworkLimits(max_enis=3, ipv4_per_eni=10, nitro=True),
+    "m4.large": InstanceNetworkLimits(max_enis=2, ipv4_per_eni=10, nitro=False),
+    "m5.large": InstanceNetworkLimits(max_enis=3, ipv4_per_eni=10, nitro=True),
+    "m6g.large": InstanceNetworkLimits(max_enis=3, ipv4_per_eni=10, nitro=True),
+    "t3.large": InstanceNetworkLimits(max_enis=3, ipv4_per_eni=12, nitro=True),
+}
+
+
+class NodegroupCapacity(typing.NamedTuple):
+    name: str
+    instance_types: typing.Sequence[str]
+    max_size: int
+
+
+def max_pods(limits: InstanceNetworkLimits, prefix_delegation: bool) -> int:
+    """Max pods of a node, as computed by the EKS max-pods calculator."""
+    if prefix_delegation:
+        return min(limits.max_enis * (limits.ipv4_per_eni - 1) * IPS_PER_PREFIX + 2, PREFIX_DELEGATION_MAX_PODS)
+    return limits.max_enis * (limits.ipv4_per_eni - 1) + 2
+
+
+def peak_ips_per_node(limits: InstanceNetworkLimits, prefix_delegation: bool) -> int:
+    """Subnet IPs a node holds when it runs at its max pods, including the VPC CNI warm pool."""
+    if not prefix_delegation:
+        # Every ENI is attached with all of its secondary IPs
+        return limits.max_enis * limits.ipv4_per_eni
+    # The two host network pods (aws-node and kube-proxy) don't need a pod IP, plus one warm prefix
+    prefixes = math.ceil((max_pods(limits, prefix_delegation) - 2) / IPS_PER_PREFIX) + 1
+    enis = min(math.ceil(prefixes / (limits.ipv4_per_eni - 1)), limits.max_enis)
+    return prefixes * IPS_PER_PREFIX + enis
+
+
+def usable_ips(cidr_block: str) -> int:
+    return ipaddress.ip_network(cidr_block).num_addresses - RESERVED_IPS_PER_SUBNET
+
+
+class CapacityReport:
+    def __init__(
+            self,
+            nodegroups: typing.Sequence[NodegroupCapacity],
+            nodegroup_subnet_cidrs: typing.Sequence[str],
+            control_plane_subnet_cidrs: typing.Sequence[str],
+            vpc_endpoint_enis_per_subnet: int = 0,
+            reserved_ips_per_subnet: int = 0,
+            prefix_delegation: bool = False,
+    ) -> None:
+        """Projected peak scale of an EKS environment against the size of its subnets.
+
+        :param nodegroups: The nodegroups of the cluster, at their max size.
+        :param nodegroup_subnet_cidrs: CIDRs of the subnets the nodes and pods are placed in, one per AZ.
+        :param control_plane_subnet_cidrs: CIDRs of the subnets of the control plane ENIs.
+        :param vpc_endpoint_enis_per_subnet: Interface VPC endpoint ENIs in every nodegroup subnet. Default: - 0.
+        :param reserved_ips_per_subnet: IPs kept free in every nodegroup subnet for ENIs that aren't planned, like
+            load balancers and VPC Lambda functions. Default: - 0.
+        :param prefix_delegation: Whether the VPC CNI assigns /28 prefixes instead of single IPs. Default: - False.
+        """
+        self.errors: typing.List[str] = []
+        self.warnings: typing.List[str] = []
+        self.lines: typing.List[str] = []
+
+        max_nodes = 0
+        max_enis = 0
+        max_ips = 0
+        max_pod_capacity = 0
+        for nodegroup in nodegroups:
+            unknown_instance_types = [
+                instance_type for instance_type in nodegroup.instance_types
+                if instance_type not in INSTANCE_NETWORK_LIMITS
+            ]
+            if unknown_instance_types:
+                self.warnings.append(
+                    "{nodegroup}: unknown network limits for {instance_types}, add them to INSTANCE_NETWORK_LIMITS "
+                    "to include them in the capacity plan".format(
+                        nodegroup=nodegroup.name, instance_types=", ".join(unknown_instance_types)))
+            limits = [
+                INSTANCE_NETWORK_LIMITS[instance_type] for instance_type in nodegroup.instance_types
+                if instance_type in INSTANCE_NETWORK_LIMITS
+            ]
+            if not limits:
+                continue
+            if prefix_delegation and not all(limit.nitro for limit in limits):
+                self.errors.append(
+                    "{nodegroup}: prefix delegation is only supported on Nitro instance types".format(
+                        nodegroup=nodegroup.name))
+
+            # Mixed instance types nodegroups are planned with their worst case instance type
+            nodegroup_max_pods = min(max_pods(limit, prefix_delegation) for limit in limits)
+            nodegroup_max_ips = max(peak_ips_per_node(limit, prefix_delegation) for limit in limits)
+            nodegroup_max_enis = max(limit.max_enis for limit in limits)
+
+            max_nodes += nodegroup.max_size
+            max_enis += nodegroup.max_size * nodegroup_max_enis
+            max_ips += nodegroup.max_size * nodegroup_max_ips
+            max_pod_capacity += nodegroup.max_size * nodegroup_max_pods
+            self.lines.append(
+                "{nodegroup}: {nodes} nodes x {pods} pods, up to {ips} IPs per node".format(
+                    nodegroup=nodegroup.name, nodes=nodegroup.max_size, pods=nodegroup_max_pods,
+                    ips=nodegroup_max_ips))
+
+        self.max_nodes = max_nodes
+        self.max_enis = max_enis
+        self.max_ips = max_ips
+        self.max_pods = max_pod_capacity
+        self.lines.append(
+            "cluster: {nodes} nodes, {enis} ENIs, {ips} IPs, {pods} pods at peak scale".format(
+                nodes=max_nodes, enis=max_enis, ips=max_ips, pods=max_pod_capacity))
+
+        self._check_nodegroup_subnets(nodegroup_subnet_cidrs, vpc_endpoint_enis_per_subnet, reserved_ips_per_subnet)
+        self._check_control_plane_subnets(control_plane_subnet_cidrs)
+
+    def _check_nodegroup_subnets(self,
+                                 subnet_cidrs: typing.Sequence[str],
+                                 vpc_endpoint_enis_per_subnet: int,
+                                 reserved_ips_per_subnet: int) -> None:
+        if not subnet_cidrs:
+            self.errors.append("no nodegroup subnets")
+            return
+        # The nodegroups' auto scaling groups balance the nodes across the AZs
+        ips_per_subnet = (
+            math.ceil(self.max_ips / len(subnet_cidrs)) + vpc_endpoint_enis_per_subnet + reserved_ips_per_subnet
+        )
+        for cidr in subnet_cidrs:
+            self.lines.append(
+                "subnet {cidr}: {required} of {usable} usable IPs ({endpoints} VPC endpoint ENIs, "
+                "{reserved} reserved for load balancers and other ENIs)".format(
+                    cidr=cidr, required=ips_per_subnet, usable=usable_ips(cidr),
+                    endpoints=vpc_endpoint_enis_per_subnet, reserved=reserved_ips_per_subnet))
+            if ips_per_subnet > usable_ips(cidr):
+                self.errors.append(
+                    "subnet {cidr} has {usable} usable IPs, but peak scale needs {required}".format(
+                        cidr=cidr, usable=usable_ips(cidr), required=ips_per_subnet))
+
+    def _check_control_plane_subnets(self, subnet_cidrs: typing.Sequence[str]) -> None:
+        for cidr in subnet_cidrs:
+            if usable_ips(cidr) < EKS_CONTROL_PLANE_MIN_FREE_IPS:
+                self.errors.append(
+                    "control plane subnet {cidr} has {usable} usable IPs, EKS needs at least {required}".format(
+                        cidr=cidr, usable=usable_ips(cidr), required=EKS_CONTROL_PLANE_MIN_FREE_IPS))
+
+    def __str__(self) -> str:
+        return "\n".join(self.lines)
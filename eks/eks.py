@@ -6,8 +6,15 @@ import requests
 from aws_cdk import aws_ec2 as ec2
 from aws_cdk import aws_eks as eks
 from aws_cdk import aws_iam as iam
+from aws_cdk import aws_lambda as lambda_
 from aws_cdk import core as cdk
 
+from eks.capacity import CapacityReport
+from eks.capacity import NodegroupCapacity
+
+NODEGROUP_COLORS = ("blue", "green")
+INACTIVE_NODEGROUP_TAINT_KEY = "eks-multi-env/inactive-nodegroup"
+
 
 class EKSEnvironmentProps(cdk.StackProps):
 
@@ -22,6 +29,31 @@ class EKSEnvironmentProps(cdk.StackProps):
             create_arm_nodegroup: typing.Optional[builtins.bool] = False,
             deploy_cluster_autoscaler: typing.Optional[builtins.bool] = True,
             deploy_aws_lb_controller: typing.Optional[builtins.bool] = True,
+            cluster_version: typing.Optional[builtins.str] = "1.21",
+            nodegroup_version: typing.Optional[builtins.str] = None,
+            nodegroup_max_unavailable: typing.Optional[builtins.int] = None,
+            nodegroup_max_unavailable_percentage: typing.Optional[builtins.int] = None,
+            blue_green_nodegroups: typing.Optional[builtins.bool] = False,
+            active_nodegroup_color: typing.Optional[builtins.str] = "blue",
+            inactive_nodegroup_version: typing.Optional[builtins.str] = None,
+            retire_inactive_nodegroups: typing.Optional[builtins.bool] = False,
+            drain_inactive_nodegroups: typing.Optional[builtins.bool] = False,
+            kubectl_memory_mib: typing.Optional[builtins.int] = None,
+            kubectl_layer_arn: typing.Optional[builtins.str] = None,
+            kubectl_environment: typing.Optional[typing.Mapping[builtins.str, builtins.str]] = None,
+            ingress_performance_profile: typing.Optional[builtins.bool] = False,
+            ingress_group_name: typing.Optional[builtins.str] = "shared",
+            lb_controller_max_concurrent_reconciles: typing.Optional[builtins.int] = 10,
+            deploy_ebs_csi_driver: typing.Optional[builtins.bool] = False,
+            ebs_csi_driver_version: typing.Optional[builtins.str] = None,
+            gp3_iops: typing.Optional[builtins.int] = 3000,
+            gp3_throughput_mibps: typing.Optional[builtins.int] = 125,
+            create_io2_storage_class: typing.Optional[builtins.bool] = False,
+            io2_iops_per_gb: typing.Optional[builtins.int] = 50,
+            default_storage_class: typing.Optional[builtins.str] = "gp3",
+            assume_cni_prefix_delegation: typing.Optional[builtins.bool] = False,
+            capacity_reserved_ips_per_subnet: typing.Optional[builtins.int] = 32,
+            fail_on_capacity_shortfall: typing.Optional[builtins.bool] = True,
     ) -> None:
         """Initialization props for EKSEnvironment.
 
@@ -34,6 +66,47 @@ class EKSEnvironmentProps(cdk.StackProps):
         :param create_arm_nodegroup: Create Arm based instances node group. Default: - False.
         :param deploy_cluster_autoscaler: Deploy Cluster Autoscaler add-on. Default: - True.
         :param deploy_aws_lb_controller: Deploy AWS Load Balancer Controller add-on. Default: - True.
+        :param cluster_version: Kubernetes version of the control plane. Default: - "1.21".
+        :param nodegroup_version: Kubernetes version of the (active) nodegroups. Default: - None, same as the
+            control plane.
+        :param nodegroup_max_unavailable: Max number of nodes unavailable during a nodegroup update, 1 to 100.
+            Default: - None.
+        :param nodegroup_max_unavailable_percentage: Max percentage of nodes unavailable during a nodegroup update,
+            1 to 100. Mutually exclusive with nodegroup_max_unavailable. Default: - None.
+        :param blue_green_nodegroups: Create a "blue" and a "green" copy of every nodegroup. The inactive color is
+            tainted NoSchedule. Default: - False.
+        :param active_nodegroup_color: The nodegroup color running nodegroup_version. Default: - "blue".
+        :param inactive_nodegroup_version: Kubernetes version kept by the inactive color until it is retired.
+            Default: - None, same as the control plane.
+        :param retire_inactive_nodegroups: Remove the inactive color nodegroups. Default: - False.
+        :param drain_inactive_nodegroups: Add a pipeline step that drains the inactive color nodegroups after the
+            environment was approved. Default: - False.
+        :param kubectl_memory_mib: Memory of the kubectl provider Lambda that installs the charts and manifests.
+            Default: - None, the aws-eks default (1GiB).
+        :param kubectl_layer_arn: ARN of a Lambda layer with kubectl and helm for the kubectl provider.
+            Default: - None, the layer bundled with aws-eks.
+        :param kubectl_environment: Environment variables of the kubectl provider Lambda. Default: - None.
+        :param ingress_performance_profile: Configure the AWS Load Balancer Controller for high throughput: IP targets
+            by default and a default IngressClass that shares one ALB per IngressGroup. Default: - False.
+        :param ingress_group_name: IngressGroup of the default IngressClass. Default: - "shared".
+        :param lb_controller_max_concurrent_reconciles: Max concurrent Ingress and TargetGroupBinding reconciles of
+            the AWS Load Balancer Controller, used by the ingress performance profile. Default: - 10.
+        :param deploy_ebs_csi_driver: Deploy the EBS CSI driver managed add-on and its StorageClasses. Default: - False.
+        :param ebs_csi_driver_version: Version of the EBS CSI driver add-on. Default: - None, the EKS default version.
+        :param gp3_iops: Provisioned IOPS of the gp3 StorageClass, 3000 to 16000. Default: - 3000.
+        :param gp3_throughput_mibps: Provisioned throughput in MiB/s of the gp3 StorageClass, 125 to 1000 and at most
+            gp3_iops / 4. Default: - 125.
+        :param create_io2_storage_class: Create an io2 StorageClass as well. Default: - False.
+        :param io2_iops_per_gb: IOPS per GiB of the io2 StorageClass, 1 to 500. Default: - 50.
+        :param default_storage_class: StorageClass set as the cluster default, "gp3", "io2" or None to keep the
+            in-tree gp2 class. Default: - "gp3".
+        :param assume_cni_prefix_delegation: Plan the pod and IP capacity as if the VPC CNI runs with prefix
+            delegation. This project does not configure it, ENABLE_PREFIX_DELEGATION on aws-node and the nodes'
+            max-pods have to be set outside of it. Default: - False.
+        :param capacity_reserved_ips_per_subnet: IPs reserved in every private subnet for ENIs the capacity planner
+            doesn't count, like internal load balancers and the kubectl provider Lambda. Default: - 32.
+        :param fail_on_capacity_shortfall: Fail synth when the nodegroups at max size would not fit in the subnets,
+            instead of only warning. Default: - True.
         """
         super().__init__()
 
@@ -46,6 +119,86 @@ class EKSEnvironmentProps(cdk.StackProps):
         self.create_arm_nodegroup = create_arm_nodegroup
         self.deploy_cluster_autoscaler = deploy_cluster_autoscaler
         self.deploy_aws_lb_controller = deploy_aws_lb_controller
+        self.cluster_version = cluster_version
+        self.nodegroup_version = nodegroup_version
+        self.nodegroup_max_unavailable = nodegroup_max_unavailable
+        self.nodegroup_max_unavailable_percentage = nodegroup_max_unavailable_percentage
+        self.blue_green_nodegroups = blue_green_nodegroups
+        self.active_nodegroup_color = active_nodegroup_color
+        self.inactive_nodegroup_version = inactive_nodegroup_version
+        self.retire_inactive_nodegroups = retire_inactive_nodegroups
+        self.drain_inactive_nodegroups = drain_inactive_nodegroups
+        self.kubectl_memory_mib = kubectl_memory_mib
+        self.kubectl_layer_arn = kubectl_layer_arn
+        self.kubectl_environment = kubectl_environment
+        self.ingress_performance_profile = ingress_performance_profile
+        self.ingress_group_name = ingress_group_name
+        self.lb_controller_max_concurrent_reconciles = lb_controller_max_concurrent_reconciles
+        self.deploy_ebs_csi_driver = deploy_ebs_csi_driver
+        self.ebs_csi_driver_version = ebs_csi_driver_version
+        self.gp3_iops = gp3_iops
+        self.gp3_throughput_mibps = gp3_throughput_mibps
+        self.create_io2_storage_class = create_io2_storage_class
+        self.io2_iops_per_gb = io2_iops_per_gb
+        self.default_storage_class = default_storage_class
+        self.assume_cni_prefix_delegation = assume_cni_prefix_delegation
+        self.capacity_reserved_ips_per_subnet = capacity_reserved_ips_per_subnet
+        self.fail_on_capacity_shortfall = fail_on_capacity_shortfall
+
+        if nodegroup_max_unavailable is not None and nodegroup_max_unavailable_percentage is not None:
+            raise ValueError(
+                "nodegroup_max_unavailable and nodegroup_max_unavailable_percentage are mutually exclusive")
+        if nodegroup_max_unavailable is not None and not 1 <= nodegroup_max_unavailable <= 100:
+            raise ValueError("nodegroup_max_unavailable must be between 1 and 100")
+        if nodegroup_max_unavailable_percentage is not None and not 1 <= nodegroup_max_unavailable_percentage <= 100:
+            raise ValueError("nodegroup_max_unavailable_percentage must be between 1 and 100")
+        # See https://docs.aws.amazon.com/AWSEC2/latest/UserGuide/general-purpose.html#gp3-ebs-volume-type
+        if not 3000 <= gp3_iops <= 16000:
+            raise ValueError("gp3_iops must be between 3000 and 16000")
+        if not 125 <= gp3_throughput_mibps <= 1000:
+            raise ValueError("gp3_throughput_mibps must be between 125 and 1000")
+        if gp3_throughput_mibps > gp3_iops / 4:
+            raise ValueError("gp3_throughput_mibps can be at most gp3_iops / 4")
+        # See https://docs.aws.amazon.com/AWSEC2/latest/UserGuide/provisioned-iops.html
+        if not 1 <= io2_iops_per_gb <= 500:
+            raise ValueError("io2_iops_per_gb must be between 1 and 500")
+        if default_storage_class not in (None, "gp3", "io2"):
+            raise ValueError("default_storage_class must be one of gp3, io2 or None")
+        if default_storage_class == "io2" and not create_io2_storage_class:
+            raise ValueError("default_storage_class io2 requires create_io2_storage_class")
+        if active_nodegroup_color not in NODEGROUP_COLORS:
+            raise ValueError(
+                "active_nodegroup_color must be one of {colors}".format(colors=", ".join(NODEGROUP_COLORS)))
+
+    @property
+    def inactive_nodegroup_color(self) -> str:
+        return next(color for color in NODEGROUP_COLORS if color != self.active_nodegroup_color)
+
+    def nodegroup_names(self) -> typing.List[str]:
+        """Names of the nodegroups created for this environment, without the blue/green suffix."""
+        nodegroup_names = ["od-default-ng"]
+        if self.create_spot_nodegroup:
+            nodegroup_names.append("spot-default-ng")
+        if self.create_arm_nodegroup:
+            nodegroup_names.append("od-graviton-ng")
+        return nodegroup_names
+
+    def inactive_nodegroup_names(self) -> typing.List[str]:
+        if not self.blue_green_nodegroups or self.retire_inactive_nodegroups:
+            return []
+        return [
+            "{name}-{color}".format(name=name, color=self.inactive_nodegroup_color)
+            for name in self.nodegroup_names()
+        ]
+
+    def active_nodegroup_names(self) -> typing.List[str]:
+        """Names of the active color nodegroups, in the same order as inactive_nodegroup_names."""
+        if not self.blue_green_nodegroups:
+            return []
+        return [
+            "{name}-{color}".format(name=name, color=self.active_nodegroup_color)
+            for name in self.nodegroup_names()
+        ]
 
 
 class EKSEnvironment(cdk.Construct):
@@ -55,6 +208,7 @@ class EKSEnvironment(cdk.Construct):
             id: str,
             vpc: ec2.Vpc,
             eks_environment_props: EKSEnvironmentProps,
+            vpc_endpoint_enis_per_subnet: int = 0,
 
     ):
         super().__init__(scope, id)
@@ -62,9 +216,13 @@ class EKSEnvironment(cdk.Construct):
         self.eks_environment_props = eks_environment_props
 
         self.vpc = vpc
+        self.vpc_endpoint_enis_per_subnet = vpc_endpoint_enis_per_subnet
+        self.nodegroup_capacities: typing.List[NodegroupCapacity] = []
+        self.nodegroups: typing.List[eks.Nodegroup] = []
 
         self.eks_cluster = self._create_eks()
         self._create_nodegroups()
+        self._plan_capacity()
         self._deploy_addons()
 
     def _create_eks(self) -> eks.Cluster:
@@ -107,6 +265,16 @@ class EKSEnvironment(cdk.Construct):
         eks_security_group.add_ingress_rule(
             ec2.Peer.ipv4(self.vpc.vpc_cidr_block), ec2.Port.all_traffic()
         )
+
+        # All charts and manifests are installed through the kubectl provider Lambda
+        kubectl_memory = None
+        if self.eks_environment_props.kubectl_memory_mib is not None:
+            kubectl_memory = cdk.Size.mebibytes(self.eks_environment_props.kubectl_memory_mib)
+        kubectl_layer = None
+        if self.eks_environment_props.kubectl_layer_arn is not None:
+            kubectl_layer = lambda_.LayerVersion.from_layer_version_arn(
+                self, "KubectlLayer", self.eks_environment_props.kubectl_layer_arn)
+
         # Create an EKS Cluster
         eks_cluster = eks.Cluster(
             self,
@@ -122,7 +290,10 @@ class EKSEnvironment(cdk.Construct):
             default_capacity=0,
             security_group=cast(ec2.ISecurityGroup, eks_security_group),
             endpoint_access=eks.EndpointAccess.PRIVATE,
-            version=eks.KubernetesVersion.V1_21,
+            version=eks.KubernetesVersion.of(self.eks_environment_props.cluster_version),
+            kubectl_memory=kubectl_memory,
+            kubectl_layer=kubectl_layer,
+            kubectl_environment=self.eks_environment_props.kubectl_environment,
         )
 
         return eks_cluster
@@ -153,7 +324,7 @@ class EKSEnvironment(cdk.Construct):
                                       )
 
         # On Demand subnets nodegroup
-        self.eks_cluster.add_nodegroup_capacity(
+        self._add_nodegroup(
             "ODDefaultNodegroup",
             nodegroup_name="od-default-ng",
             capacity_type=eks.CapacityType.ON_DEMAND,
@@ -182,7 +353,7 @@ class EKSEnvironment(cdk.Construct):
                                             )
 
             # Spot subnets nodegroup
-            self.eks_cluster.add_nodegroup_capacity(
+            self._add_nodegroup(
                 "SpotDefaultNodegroup",
                 nodegroup_name="spot-default-ng",
                 capacity_type=eks.CapacityType.SPOT,
@@ -213,7 +384,7 @@ class EKSEnvironment(cdk.Construct):
                                            managed_policies=required_nodegroup_managed_policy,
                                            )
             # Graviton subnets nodegroup
-            self.eks_cluster.add_nodegroup_capacity(
+            self._add_nodegroup(
                 "ODGravitonNodegroup",
                 nodegroup_name="od-graviton-ng",
                 capacity_type=eks.CapacityType.SPOT,
@@ -228,6 +399,91 @@ class EKSEnvironment(cdk.Construct):
                 subnets=ec2.SubnetSelection(subnet_group_name="Private")
             )
 
+    def _add_nodegroup(self, id_: str, nodegroup_name: str, **nodegroup_options: typing.Any) -> None:
+        props = self.eks_environment_props
+        if not props.blue_green_nodegroups:
+            self._add_versioned_nodegroup(id_, nodegroup_name, props.nodegroup_version, nodegroup_options)
+            return
+
+        # Blue/green nodegroups: the active color runs the new version next to the inactive color, so the
+        # cluster keeps its full serving capacity until the inactive color is drained and retired.
+        self._add_versioned_nodegroup(
+            id_ + props.active_nodegroup_color.capitalize(),
+            "{name}-{color}".format(name=nodegroup_name, color=props.active_nodegroup_color),
+            props.nodegroup_version,
+            dict(nodegroup_options, labels={"nodegroup-color": props.active_nodegroup_color}),
+        )
+        if not props.retire_inactive_nodegroups:
+            # The running pods stay until the drain, but new pods are only scheduled on the active color
+            self._add_versioned_nodegroup(
+                id_ + props.inactive_nodegroup_color.capitalize(),
+                "{name}-{color}".format(name=nodegroup_name, color=props.inactive_nodegroup_color),
+                props.inactive_nodegroup_version,
+                dict(
+                    nodegroup_options,
+                    labels={"nodegroup-color": props.inactive_nodegroup_color},
+                    taints=[eks.TaintSpec(
+                        effect=eks.TaintEffect.NO_SCHEDULE,
+                        key=INACTIVE_NODEGROUP_TAINT_KEY,
+                        value="true",
+                    )],
+                ),
+            )
+
+    def _add_versioned_nodegroup(self,
+                                 id_: str,
+                                 nodegroup_name: str,
+                                 version: typing.Optional[str],
+                                 nodegroup_options: typing.Dict[str, typing.Any]) -> eks.Nodegroup:
+        props = self.eks_environment_props
+        nodegroup = self.eks_cluster.add_nodegroup_capacity(
+            id_,
+            nodegroup_name=nodegroup_name,
+            **nodegroup_options,
+        )
+        self.nodegroups.append(nodegroup)
+        self.nodegroup_capacities.append(NodegroupCapacity(
+            name=nodegroup_name,
+            instance_types=[instance_type.to_string() for instance_type in nodegroup_options["instance_types"]],
+            max_size=nodegroup_options["max_size"],
+        ))
+        cfn_nodegroup = cast(eks.CfnNodegroup, nodegroup.node.default_child)
+        if version is not None:
+            cfn_nodegroup.version = version
+        if props.nodegroup_max_unavailable is not None or props.nodegroup_max_unavailable_percentage is not None:
+            cfn_nodegroup.update_config = eks.CfnNodegroup.UpdateConfigProperty(
+                max_unavailable=props.nodegroup_max_unavailable,
+                max_unavailable_percentage=props.nodegroup_max_unavailable_percentage,
+            )
+        return nodegroup
+
+    def _plan_capacity(self) -> None:
+        # Check at synth time that the nodegroups at their max size fit in the subnets
+        capacity_report = CapacityReport(
+            nodegroups=self.nodegroup_capacities,
+            nodegroup_subnet_cidrs=[
+                subnet.ipv4_cidr_block for subnet in self.vpc.select_subnets(subnet_group_name="Private").subnets
+            ],
+            control_plane_subnet_cidrs=[
+                subnet.ipv4_cidr_block
+                for subnet in self.vpc.select_subnets(subnet_group_name="eks-control-plane").subnets
+            ],
+            vpc_endpoint_enis_per_subnet=self.vpc_endpoint_enis_per_subnet,
+            reserved_ips_per_subnet=self.eks_environment_props.capacity_reserved_ips_per_subnet,
+            prefix_delegation=self.eks_environment_props.assume_cni_prefix_delegation,
+        )
+        self.capacity_report = capacity_report
+
+        annotations = cdk.Annotations.of(self)
+        annotations.add_info("Capacity plan:\n" + str(capacity_report))
+        for warning in capacity_report.warnings:
+            annotations.add_warning(warning)
+        for error in capacity_report.errors:
+            if self.eks_environment_props.fail_on_capacity_shortfall:
+                annotations.add_error(error)
+            else:
+                annotations.add_warning(error)
+
     def _create_fargate_profile(self) -> None:
         self.eks_cluster.add_fargate_profile(
             "DefaultFargateProfile",
@@ -249,6 +505,9 @@ class EKSEnvironment(cdk.Construct):
         if self.eks_environment_props.deploy_aws_lb_controller:
             self._deploy_aws_load_balancer_controller()
 
+        if self.eks_environment_props.deploy_ebs_csi_driver:
+            self._deploy_ebs_csi_driver()
+
     def _deploy_cluster_autoscaler(self) -> None:
         ca_sa_name = "cluster-autoscaler"
         cluster_autoscaler_service_account = self.eks_cluster.add_service_account(
@@ -308,7 +567,9 @@ class EKSEnvironment(cdk.Construct):
                 "replicaCount": 1
             }
         )
-        cluster_autoscaler_chart.node.add_dependency(self.eks_cluster)
+        # The chart's pods run with the service account, so it has to exist first
+        cluster_autoscaler_chart.node.add_dependency(
+            cluster_autoscaler_service_account)
 
     def _deploy_aws_load_balancer_controller(self):
         aws_lb_controller_name = "aws-load-balancer-controller"
@@ -319,7 +580,7 @@ class EKSEnvironment(cdk.Construct):
             namespace="kube-system"
         )
         resp = requests.get(
-            "https://raw.githubusercontent.com/kubernetes-sigs/aws-load-balancer-controller/v2.2.0/docs/install/"
+            "https://raw.githubusercontent.com/kubernetes-sigs/aws-load-balancer-controller/v2.4.1/docs/install/"
             "iam_policy.json"
         )
         aws_load_balancer_controller_policy = resp.json()
@@ -330,27 +591,172 @@ class EKSEnvironment(cdk.Construct):
 
         # Deploy the AWS Load Balancer Controller from the AWS Helm Chart
         # For more info check out https://github.com/aws/eks-charts/tree/master/stable/aws-load-balancer-controller
+        aws_lb_controller_values = {
+            "clusterName": self.eks_cluster.cluster_name,
+            "region": self.eks_environment_props.cdk_env.region,
+            "vpcId": self.vpc.vpc_id,
+            "serviceAccount": {
+                "create": False,
+                "name": aws_lb_controller_name
+            },
+            "replicaCount": 2
+        }
+        if self.eks_environment_props.ingress_performance_profile:
+            # Route straight to the pod IPs instead of through a NodePort and kube-proxy hop
+            aws_lb_controller_values.update({
+                "defaultTargetType": "ip",
+                "ingressMaxConcurrentReconciles": self.eks_environment_props.lb_controller_max_concurrent_reconciles,
+                "targetgroupbindingMaxConcurrentReconciles":
+                    self.eks_environment_props.lb_controller_max_concurrent_reconciles,
+            })
+
+        # Helm doesn't upgrade the chart's CRDs, apply them before bumping the version (see the README)
         aws_lb_controller_chart = self.eks_cluster.add_helm_chart(
             "aws-load-balancer-controller",
             chart="aws-load-balancer-controller",
-            version="1.2.3",
+            version="1.4.1",
             release="aws-lb-controller",
             repository="https://aws.github.io/eks-charts",
             namespace="kube-system",
-            values={
-                "clusterName": self.eks_cluster.cluster_name,
-                "region": self.eks_environment_props.cdk_env.region,
-                "vpcId": self.vpc.vpc_id,
-                "serviceAccount": {
-                    "create": False,
-                    "name": aws_lb_controller_name
-                },
-                "replicaCount": 2
-            }
+            values=aws_lb_controller_values,
         )
         aws_lb_controller_chart.node.add_dependency(
             aws_lb_controller_service_account)
 
+        if self.eks_environment_props.ingress_performance_profile:
+            self._deploy_default_ingress_class(aws_lb_controller_chart)
+
+    def _deploy_default_ingress_class(self, aws_lb_controller_chart: eks.HelmChart) -> None:
+        # Ingresses without an explicit class join a single IngressGroup, so they share one ALB
+        # The scheme is left to the alb.ingress.kubernetes.io/scheme annotation, IngressClassParams would override it
+        # For more info see https://kubernetes-sigs.github.io/aws-load-balancer-controller/v2.4/guide/ingress/ingress_class/
+        ingress_class_params = {
+            "apiVersion": "elbv2.k8s.aws/v1beta1",
+            "kind": "IngressClassParams",
+            "metadata": {
+                "name": "alb-" + self.eks_environment_props.ingress_group_name,
+            },
+            "spec": {
+                "group": {
+                    "name": self.eks_environment_props.ingress_group_name,
+                },
+            },
+        }
+        ingress_class = {
+            "apiVersion": "networking.k8s.io/v1",
+            "kind": "IngressClass",
+            "metadata": {
+                "name": "alb-" + self.eks_environment_props.ingress_group_name,
+                "annotations": {
+                    "ingressclass.kubernetes.io/is-default-class": "true",
+                },
+            },
+            "spec": {
+                "controller": "ingress.k8s.aws/alb",
+                "parameters": {
+                    "apiGroup": "elbv2.k8s.aws",
+                    "kind": "IngressClassParams",
+                    "name": "alb-" + self.eks_environment_props.ingress_group_name,
+                },
+            },
+        }
+        # The IngressClassParams CRD is installed by the controller chart
+        default_ingress_class = self.eks_cluster.add_manifest(
+            "default-ingress-class", ingress_class_params, ingress_class)
+        default_ingress_class.node.add_dependency(aws_lb_controller_chart)
+
+    def _deploy_ebs_csi_driver(self) -> None:
+        ebs_csi_sa_name = "ebs-csi-controller-sa"
+
+        # IAM role for the service account created by the managed add-on (IRSA)
+        ebs_csi_driver_role_conditions = cdk.CfnJson(
+            self,
+            "EbsCsiDriverRoleConditions",
+            value={
+                self.eks_cluster.cluster_open_id_connect_issuer + ":aud": "sts.amazonaws.com",
+                self.eks_cluster.cluster_open_id_connect_issuer + ":sub":
+                    "system:serviceaccount:kube-system:" + ebs_csi_sa_name,
+            },
+        )
+        ebs_csi_driver_role = iam.Role(
+            self,
+            "EbsCsiDriverRole",
+            assumed_by=iam.OpenIdConnectPrincipal(
+                self.eks_cluster.open_id_connect_provider,
+                conditions={"StringEquals": ebs_csi_driver_role_conditions},
+            ),
+            managed_policies=[
+                iam.ManagedPolicy.from_aws_managed_policy_name(
+                    managed_policy_name="service-role/AmazonEBSCSIDriverPolicy"),
+            ],
+        )
+
+        # Install the EBS CSI driver as EKS managed add-on
+        # For more info see https://docs.aws.amazon.com/eks/latest/userguide/managing-ebs-csi.html
+        ebs_csi_driver_addon = eks.CfnAddon(
+            self,
+            "EbsCsiDriverAddon",
+            addon_name="aws-ebs-csi-driver",
+            addon_version=self.eks_environment_props.ebs_csi_driver_version,
+            cluster_name=self.eks_cluster.cluster_name,
+            resolve_conflicts="OVERWRITE",
+            service_account_role_arn=ebs_csi_driver_role.role_arn,
+        )
+        # The driver's controller pods need nodes for the add-on to become active
+        for nodegroup in self.nodegroups:
+            ebs_csi_driver_addon.node.add_dependency(nodegroup)
+
+        # WaitForFirstConsumer creates the volume in the AZ the pod was scheduled to
+        storage_classes = {
+            "gp3": {
+                "type": "gp3",
+                "iops": str(self.eks_environment_props.gp3_iops),
+                "throughput": str(self.eks_environment_props.gp3_throughput_mibps),
+                "encrypted": "true",
+            },
+        }
+        if self.eks_environment_props.create_io2_storage_class:
+            storage_classes["io2"] = {
+                "type": "io2",
+                "iopsPerGB": str(self.eks_environment_props.io2_iops_per_gb),
+                "allowAutoIOPSPerGBIncrease": "true",
+                "encrypted": "true",
+            }
+
+        storage_class_manifests = [
+            {
+                "apiVersion": "storage.k8s.io/v1",
+                "kind": "StorageClass",
+                "metadata": {
+                    "name": name,
+                    "annotations": {
+                        "storageclass.kubernetes.io/is-default-class": str(
+                            name == self.eks_environment_props.default_storage_class).lower(),
+                    },
+                },
+                "provisioner": "ebs.csi.aws.com",
+                "volumeBindingMode": "WaitForFirstConsumer",
+                "allowVolumeExpansion": True,
+                "reclaimPolicy": "Delete",
+                "parameters": parameters,
+            }
+            for name, parameters in storage_classes.items()
+        ]
+        storage_classes_manifest = self.eks_cluster.add_manifest("ebs-storage-classes", *storage_class_manifests)
+        storage_classes_manifest.node.add_dependency(ebs_csi_driver_addon)
+
+        if self.eks_environment_props.default_storage_class is not None:
+            # Only one StorageClass can be the default, so unset it on the gp2 class EKS creates
+            gp2_default_patch = eks.KubernetesPatch(
+                self,
+                "Gp2NotDefaultStorageClass",
+                cluster=self.eks_cluster,
+                resource_name="storageclass/gp2",
+                apply_patch={"metadata": {"annotations": {"storageclass.kubernetes.io/is-default-class": "false"}}},
+                restore_patch={"metadata": {"annotations": {"storageclass.kubernetes.io/is-default-class": "true"}}},
+            )
+            storage_classes_manifest.node.add_dependency(gp2_default_patch)
+
     def _deploy_bastion(self):
         # Create an Instance Profile for our Admin Role to assume w/EC2
         cluster_admin_role_instance_profile = iam.CfnInstanceProfile(
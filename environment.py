@@ -31,5 +31,6 @@ class EKSMultiEnv(cdk.Stage):
         EKSEnvironment(scope=eks_multi_env_cluster_stack,
                        id="EKSMultiEnvClusterEKS",
                        vpc=network.vpc,
+                       vpc_endpoint_enis_per_subnet=network.vpc_endpoint_enis_per_subnet,
                        eks_environment_props=eks_env_props,
                        )
@@ -0,0 +1,173 @@
+import builtins
+import typing
+from pathlib import Path
+
+from aws_cdk import aws_cloudwatch as cloudwatch
+from aws_cdk import aws_codepipeline as codepipeline
+from aws_cdk import aws_events as events
+from aws_cdk import aws_events_targets as events_targets
+from aws_cdk import aws_iam as iam
+from aws_cdk import aws_lambda as lambda_
+from aws_cdk import core as cdk
+
+METRICS_NAMESPACE = "EKSMultiEnv/Pipeline"
+
+
+class PipelineMetrics(cdk.Construct):
+    def __init__(
+            self,
+            scope: cdk.Construct,
+            id_: str,
+            pipeline: codepipeline.IPipeline,
+            deploy_stage_names: typing.Sequence[builtins.str],
+            deploy_duration_alarm_threshold: cdk.Duration = cdk.Duration.minutes(60),
+    ):
+        """Publish the pipeline execution durations and failures as CloudWatch metrics.
+
+        :param scope: scope of construct.
+        :param id_: id of construct.
+        :param pipeline: The CodePipeline pipeline to measure.
+        :param deploy_stage_names: Names of the pipeline stages that deploy an EKS environment, alarmed on the p90
+            duration of their CloudFormation deploy actions. Manual approvals don't count towards it.
+        :param deploy_duration_alarm_threshold: p90 deploy duration that triggers an alarm. Default: - 60 minutes.
+        """
+        super().__init__(scope, id_)
+
+        self.pipeline = pipeline
+
+        metrics_publisher = lambda_.Function(
+            self,
+            "MetricsPublisher",
+            runtime=lambda_.Runtime.PYTHON_3_9,
+            handler="index.handler",
+            code=lambda_.Code.from_asset(
+                str(Path(__file__).resolve().parent.joinpath("pipeline_metrics_handler"))),
+            timeout=cdk.Duration.seconds(30),
+            environment={
+                "METRICS_NAMESPACE": METRICS_NAMESPACE,
+            },
+        )
+        metrics_publisher.add_to_role_policy(iam.PolicyStatement(
+            actions=[
+                "codepipeline:ListActionExecutions",
+                "codepipeline:ListPipelineExecutions",
+            ],
+            resources=[pipeline.pipeline_arn],
+        ))
+        # PutMetricData does not support resource-level permissions
+        metrics_publisher.add_to_role_policy(iam.PolicyStatement(
+            actions=["cloudwatch:PutMetricData"],
+            resources=["*"],
+            conditions={"StringEquals": {"cloudwatch:namespace": METRICS_NAMESPACE}},
+        ))
+
+        events.Rule(
+            self,
+            "PipelineStateChangeRule",
+            event_pattern=events.EventPattern(
+                source=["aws.codepipeline"],
+                detail_type=[
+                    "CodePipeline Pipeline Execution State Change",
+                    "CodePipeline Stage Execution State Change",
+                    "CodePipeline Action Execution State Change",
+                ],
+                detail={"pipeline": [pipeline.pipeline_name]},
+            ),
+            targets=[events_targets.LambdaFunction(metrics_publisher)],
+        )
+
+        self.deploy_duration_alarms = [
+            self._metric("StageDeployDuration", statistic="p90", Stage=stage_name).create_alarm(
+                self,
+                "DeployDurationAlarm-{stage_name}".format(stage_name=stage_name),
+                alarm_description="p90 deploy duration of pipeline stage {stage_name}".format(stage_name=stage_name),
+                threshold=deploy_duration_alarm_threshold.to_seconds(),
+                evaluation_periods=1,
+                comparison_operator=cloudwatch.ComparisonOperator.GREATER_THAN_THRESHOLD,
+                treat_missing_data=cloudwatch.TreatMissingData.NOT_BREACHING,
+            )
+            for stage_name in deploy_stage_names
+        ]
+
+        self._create_dashboard()
+
+    def _metric(self, metric_name: str, statistic: str, **dimensions: str) -> cloudwatch.Metric:
+        return cloudwatch.Metric(
+            namespace=METRICS_NAMESPACE,
+            metric_name=metric_name,
+            dimensions_map=dict(dimensions, Pipeline=self.pipeline.pipeline_name),
+            statistic=statistic,
+            period=cdk.Duration.days(1),
+        )
+
+    def _search(self, metric_name: str, dimensions: str, statistic: str) -> cloudwatch.MathExpression:
+        return cloudwatch.MathExpression(
+            expression="SEARCH('{{{namespace},{dimensions}}} MetricName=\"{metric_name}\" Pipeline=\"{pipeline}\"', "
+                       "'{statistic}', 86400)".format(
+                           namespace=METRICS_NAMESPACE,
+                           dimensions=dimensions,
+                           metric_name=metric_name,
+                           pipeline=self.pipeline.pipeline_name,
+                           statistic=statistic,
+                       ),
+            using_metrics={},
+            period=cdk.Duration.days(1),
+        )
+
+    def _create_dashboard(self) -> None:
+        dashboard = cloudwatch.Dashboard(self, "Dashboard")
+        dashboard.add_widgets(
+            cloudwatch.GraphWidget(
+                title="Pipeline duration (p90, seconds)",
+                left=[self._metric("PipelineDuration", statistic="p90")],
+                width=12,
+            ),
+            cloudwatch.GraphWidget(
+                title="Pipeline failure rate",
+                left=[self._metric("PipelineFailed", statistic="Average")],
+                width=12,
+            ),
+        )
+        dashboard.add_widgets(
+            cloudwatch.GraphWidget(
+                title="Stage duration (p90, seconds)",
+                left=[self._search("StageDuration", "Pipeline,Stage", "p90")],
+                width=12,
+            ),
+            cloudwatch.GraphWidget(
+                title="Stage failure rate",
+                left=[self._search("StageFailed", "Pipeline,Stage", "Average")],
+                width=12,
+            ),
+        )
+        dashboard.add_widgets(
+            cloudwatch.GraphWidget(
+                title="Stage deploy duration, without approvals (p90, seconds)",
+                left=[self._search("StageDeployDuration", "Pipeline,Stage", "p90")],
+                width=12,
+            ),
+            cloudwatch.GraphWidget(
+                title="Interrupted stages (stopped, superseded, abandoned, canceled)",
+                left=[self._search("StageInterrupted", "Pipeline,Stage", "Sum")],
+                width=12,
+            ),
+        )
+        dashboard.add_widgets(
+            cloudwatch.GraphWidget(
+                title="Action duration (p90, seconds)",
+                left=[self._search("ActionDuration", "Pipeline,Stage,Action", "p90")],
+                width=12,
+            ),
+            cloudwatch.GraphWidget(
+                title="Action failure rate",
+                left=[self._search("ActionFailed", "Pipeline,Stage,Action", "Average")],
+                width=12,
+            ),
+        )
+        dashboard.add_widgets(
+            cloudwatch.AlarmStatusWidget(
+                title="Deploy duration alarms",
+                alarms=self.deploy_duration_alarms,
+                width=24,
+            ),
+        )
@@ -0,0 +1,136 @@
+"""Publish CodePipeline execution durations and failures as CloudWatch metrics.
+
+The handler receives the CodePipeline state change events from EventBridge. The events only carry the new state, so the
+start and end time of every execution are looked up through the CodePipeline API. Both clients are passed in to
+`publish_metrics`, which allows running it against a local stand-in of CodePipeline and CloudWatch.
+
+When a failed stage or action is retried, CodePipeline lists every attempt of the pipeline execution. Only the
+attempts of the latest retry are measured, so the time waiting for the retry doesn't count as deploy time.
+
+Only succeeded and failed executions publish a duration. Stopped, superseded, abandoned and canceled executions are
+counted in their own `Interrupted` metric, so they skew neither the durations nor the failure rate.
+"""
+import os
+import typing
+
+NAMESPACE = os.environ.get("METRICS_NAMESPACE", "EKSMultiEnv/Pipeline")
+
+PIPELINE_EVENT = "CodePipeline Pipeline Execution State Change"
+STAGE_EVENT = "CodePipeline Stage Execution State Change"
+ACTION_EVENT = "CodePipeline Action Execution State Change"
+COMPLETED_STATES = ("SUCCEEDED", "FAILED")
+INTERRUPTED_STATES = ("STOPPED", "SUPERSEDED", "ABANDONED", "CANCELED")
+
+
+def _action_executions(codepipeline: typing.Any, pipeline: str, execution_id: str) -> typing.List[dict]:
+    action_executions = []
+    paginator = codepipeline.get_paginator("list_action_executions")
+    for page in paginator.paginate(pipelineName=pipeline, filter={"pipelineExecutionId": execution_id}):
+        action_executions.extend(page["actionExecutionDetails"])
+    return action_executions
+
+
+def _pipeline_execution(codepipeline: typing.Any, pipeline: str, execution_id: str) -> typing.Optional[dict]:
+    paginator = codepipeline.get_paginator("list_pipeline_executions")
+    for page in paginator.paginate(pipelineName=pipeline):
+        for execution in page["pipelineExecutionSummaries"]:
+            if execution["pipelineExecutionId"] == execution_id:
+                return execution
+    return None
+
+
+def _duration(executions: typing.Sequence[dict]) -> typing.Optional[float]:
+    if not executions:
+        return None
+    start = min(execution["startTime"] for execution in executions)
+    end = max(execution["lastUpdateTime"] for execution in executions)
+    return (end - start).total_seconds()
+
+
+def _latest_attempts(action_executions: typing.Sequence[dict]) -> typing.List[dict]:
+    latest: typing.Dict[str, dict] = {}
+    for action_execution in action_executions:
+        action = action_execution["actionName"]
+        if action not in latest or action_execution["startTime"] > latest[action]["startTime"]:
+            latest[action] = action_execution
+    retried = [
+        action_execution for action_execution in action_executions
+        if action_execution is not latest[action_execution["actionName"]]
+    ]
+    if not retried:
+        return list(latest.values())
+    # The latest retry started after the last retried attempt ended, earlier attempts belong to previous tries
+    retry_start = max(action_execution["lastUpdateTime"] for action_execution in retried)
+    return [action_execution for action_execution in latest.values() if action_execution["startTime"] >= retry_start]
+
+
+def _is_cloudformation_deploy(action_execution: dict) -> bool:
+    action_type = action_execution["input"]["actionTypeId"]
+    return action_type["category"] == "Deploy" and action_type["provider"] == "CloudFormation"
+
+
+def _metric(metric_name: str, dimensions: typing.Dict[str, str], value: float, unit: str) -> dict:
+    return {
+        "MetricName": metric_name,
+        "Dimensions": [{"Name": name, "Value": dimension} for name, dimension in dimensions.items()],
+        "Value": value,
+        "Unit": unit,
+    }
+
+
+def publish_metrics(event: dict, codepipeline: typing.Any, cloudwatch: typing.Any) -> typing.List[dict]:
+    """Publish the metrics for a single CodePipeline event and return the published metric data."""
+    detail = event["detail"]
+    pipeline = detail["pipeline"]
+    execution_id = detail["execution-id"]
+
+    if event["detail-type"] == PIPELINE_EVENT:
+        prefix = "Pipeline"
+        dimensions = {"Pipeline": pipeline}
+    elif event["detail-type"] == STAGE_EVENT:
+        prefix = "Stage"
+        dimensions = {"Pipeline": pipeline, "Stage": detail["stage"]}
+    elif event["detail-type"] == ACTION_EVENT:
+        prefix = "Action"
+        dimensions = {"Pipeline": pipeline, "Stage": detail["stage"], "Action": detail["action"]}
+    else:
+        return []
+
+    if detail["state"] in INTERRUPTED_STATES:
+        metric_data = [_metric(prefix + "Interrupted", dimensions, 1, "Count")]
+    elif detail["state"] in COMPLETED_STATES:
+        metric_data = [_metric(prefix + "Failed", dimensions, 1 if detail["state"] == "FAILED" else 0, "Count")]
+        durations = {}
+        if prefix == "Pipeline":
+            execution = _pipeline_execution(codepipeline, pipeline, execution_id)
+            durations["PipelineDuration"] = _duration([execution] if execution else [])
+        else:
+            action_executions = _latest_attempts([
+                action_execution for action_execution in _action_executions(codepipeline, pipeline, execution_id)
+                if action_execution["stageName"] == detail["stage"]
+                and (prefix == "Stage" or action_execution["actionName"] == detail["action"])
+            ])
+            durations[prefix + "Duration"] = _duration(action_executions)
+            if prefix == "Stage":
+                # The stage duration includes the time waiting for manual approvals, the deploy duration only
+                # covers the CloudFormation change set actions
+                durations["StageDeployDuration"] = _duration([
+                    action_execution for action_execution in action_executions
+                    if _is_cloudformation_deploy(action_execution)
+                ])
+        metric_data.extend(
+            _metric(metric_name, dimensions, duration, "Seconds")
+            for metric_name, duration in durations.items() if duration is not None
+        )
+    else:
+        return []
+
+    cloudwatch.put_metric_data(Namespace=NAMESPACE, MetricData=metric_data)
+    return metric_data
+
+
+def handler(event: dict, _context: typing.Any) -> None:
+    # boto3 is only needed by the Lambda entrypoint, publish_metrics works with any compatible clients
+    import boto3  # pylint: disable=import-outside-toplevel
+
+    publish_metrics(event, boto3.client("codepipeline"), boto3.client("cloudwatch"))
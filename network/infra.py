@@ -9,6 +9,7 @@ class EKSEnvironmentNetwork(cdk.Construct):
         super().__init__(scope, id_)
 
         self.vpc: ec2.Vpc = self._create_vpc()
+        self.vpc_endpoint_enis_per_subnet = 0
 
         self.vpce_subnets = (
             self.vpc.select_subnets(subnet_group_name="Private")
@@ -83,6 +84,9 @@ class EKSEnvironmentNetwork(cdk.Construct):
                 ],
             )
 
+        # Every interface endpoint places one ENI in each of the endpoint subnets
+        self.vpc_endpoint_enis_per_subnet = len(vpc_interface_endpoints)
+
         for name, interface_service in vpc_interface_endpoints.items():
             self.vpc.add_interface_endpoint(
                 id=name,
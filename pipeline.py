@@ -6,6 +6,7 @@ import typing
 from typing import Any
 
 # import boto3
+from aws_cdk import aws_iam as iam
 from aws_cdk import aws_ssm as ssm
 from aws_cdk import core as cdk
 from aws_cdk import pipelines
@@ -13,6 +14,7 @@ from aws_cdk.core import SecretValue
 
 from environment import EKSMultiEnv
 from eks.eks import EKSEnvironmentProps
+from monitoring.pipeline_metrics import PipelineMetrics
 
 
 class Pipeline(cdk.Stack):
@@ -72,8 +74,20 @@ class Pipeline(cdk.Stack):
             cli_version=Pipeline._get_cdk_cli_version(),
         )
 
-        self._add_pre_prod_stage(cdk_pipeline)
-        self._add_prod_stage(cdk_pipeline)
+        pre_production_stage = self._add_pre_prod_stage(cdk_pipeline)
+        production_stage = self._add_prod_stage(cdk_pipeline)
+
+        # Build the pipeline now, so the underlying CodePipeline can be measured
+        cdk_pipeline.build_pipeline()
+        PipelineMetrics(
+            self,
+            "PipelineMetrics",
+            pipeline=cdk_pipeline.pipeline,
+            deploy_stage_names=[
+                pre_production_stage.stage_name,
+                production_stage.stage_name,
+            ],
+        )
 
     @staticmethod
     def _get_cdk_cli_version() -> str:
@@ -84,7 +98,7 @@ class Pipeline(cdk.Stack):
         cdk_cli_version = str(package_json["devDependencies"]["aws-cdk"])
         return cdk_cli_version
 
-    def _add_pre_prod_stage(self, cdk_pipeline: pipelines.CodePipeline) -> None:
+    def _add_pre_prod_stage(self, cdk_pipeline: pipelines.CodePipeline) -> pipelines.StageDeployment:
         eks_pre_production_props = EKSEnvironmentProps(
             env_name="pre-production",
             cluster_name="eks-multi-env",
@@ -98,14 +112,20 @@ class Pipeline(cdk.Stack):
         )
 
         pre_production_stage = cdk_pipeline.add_stage(pre_production_stage)
-        pre_production_stage.add_post(
-            pipelines.ManualApprovalStep(
-                "ConfirmPreProdDeploymentSuccessful",
-                comment="Please approve deployment to production environment",
-            )
+        approval_step = pipelines.ManualApprovalStep(
+            "ConfirmPreProdDeploymentSuccessful",
+            comment="Please approve deployment to production environment",
         )
+        pre_production_stage.add_post(approval_step)
+        self._add_drain_inactive_nodegroups_step(
+            pre_production_stage,
+            eks_pre_production_props,
+            self.pre_production_env,
+            after=approval_step,
+        )
+        return pre_production_stage
 
-    def _add_prod_stage(self, cdk_pipeline: pipelines.CodePipeline) -> None:
+    def _add_prod_stage(self, cdk_pipeline: pipelines.CodePipeline) -> pipelines.StageDeployment:
         eks_production_props = EKSEnvironmentProps(
             env_name="production",
             cluster_name="eks-multi-env",
@@ -117,4 +137,97 @@ class Pipeline(cdk.Stack):
             eks_env_props=eks_production_props,
         )
         prod_stage = cdk_pipeline.add_stage(production_stage)
-        _ = prod_stage
+        self._add_drain_inactive_nodegroups_step(
+            prod_stage,
+            eks_production_props,
+            self.production_env,
+        )
+        return prod_stage
+
+    @staticmethod
+    def _add_drain_inactive_nodegroups_step(stage_deployment: pipelines.StageDeployment,
+                                            eks_env_props: EKSEnvironmentProps,
+                                            env: cdk.Environment,
+                                            after: typing.Optional[pipelines.Step] = None) -> None:
+        inactive_nodegroup_names = eks_env_props.inactive_nodegroup_names()
+        if not eks_env_props.drain_inactive_nodegroups or not inactive_nodegroup_names:
+            return
+
+        # Before draining, the active color is scaled up to the current size of the inactive color, so the evicted
+        # pods find room right away instead of waiting for the Cluster Autoscaler.
+        # Removing the auto-discovery tags keeps the Cluster Autoscaler from scaling the inactive color back up.
+        # Scaling a managed nodegroup down to zero then cordons and drains its nodes, which moves the workloads
+        # to the active color. The nodegroups are removed afterwards by setting retire_inactive_nodegroups.
+        cluster_name = "{cluster_name}-{env_name}".format(
+            cluster_name=eks_env_props.cluster_name,
+            env_name=eks_env_props.env_name,
+        )
+
+        def nodegroup_args(nodegroup_name: str) -> str:
+            return "--region {region} --cluster-name {cluster_name} --nodegroup-name {nodegroup_name}".format(
+                region=env.region,
+                cluster_name=cluster_name,
+                nodegroup_name=nodegroup_name,
+            )
+
+        scale_up_commands = []
+        drain_commands = []
+        for inactive_nodegroup_name, active_nodegroup_name in zip(
+                inactive_nodegroup_names, eks_env_props.active_nodegroup_names()):
+            inactive_args = nodegroup_args(inactive_nodegroup_name)
+            active_args = nodegroup_args(active_nodegroup_name)
+            scale_up_commands.append(
+                "inactive_size=$(aws eks describe-nodegroup {inactive_args} "
+                "--query 'nodegroup.scalingConfig.desiredSize' --output text); "
+                "active_size=$(aws eks describe-nodegroup {active_args} "
+                "--query 'nodegroup.scalingConfig.desiredSize' --output text); "
+                "if [ \"$inactive_size\" -gt \"$active_size\" ]; then "
+                "aws eks update-nodegroup-config {active_args} --scaling-config desiredSize=$inactive_size && "
+                "aws eks wait nodegroup-active {active_args}; "
+                "fi".format(inactive_args=inactive_args, active_args=active_args)
+            )
+            drain_commands.extend([
+                "for asg in $(aws eks describe-nodegroup {args} "
+                "--query 'nodegroup.resources.autoScalingGroups[].name' --output text); do "
+                "aws autoscaling delete-tags --region {region} "
+                "--tags ResourceId=$asg,ResourceType=auto-scaling-group,Key=k8s.io/cluster-autoscaler/enabled "
+                "ResourceId=$asg,ResourceType=auto-scaling-group,Key=k8s.io/cluster-autoscaler/{cluster_name}; "
+                "done".format(args=inactive_args, region=env.region, cluster_name=cluster_name),
+                "aws eks update-nodegroup-config {args} "
+                "--scaling-config minSize=0,maxSize=1,desiredSize=0".format(args=inactive_args),
+                "aws eks wait nodegroup-active {args}".format(args=inactive_args),
+            ])
+        # Every active nodegroup is scaled up before any inactive nodegroup is drained
+        commands = scale_up_commands + drain_commands
+
+        drain_step = pipelines.CodeBuildStep(
+            "DrainInactiveNodegroups",
+            commands=commands,
+            role_policy_statements=[
+                iam.PolicyStatement(
+                    actions=[
+                        "eks:DescribeNodegroup",
+                        "eks:UpdateNodegroupConfig",
+                    ],
+                    resources=[
+                        "arn:aws:eks:{region}:{account}:nodegroup/{cluster_name}/*".format(
+                            region=env.region,
+                            account=env.account,
+                            cluster_name=cluster_name,
+                        ),
+                    ],
+                ),
+                iam.PolicyStatement(
+                    actions=["autoscaling:DeleteTags"],
+                    resources=[
+                        "arn:aws:autoscaling:{region}:{account}:autoScalingGroup:*:autoScalingGroupName/eks-*".format(
+                            region=env.region,
+                            account=env.account,
+                        ),
+                    ],
+                ),
+            ],
+        )
+        if after is not None:
+            drain_step.add_step_dependency(after)
+        stage_deployment.add_post(drain_step)
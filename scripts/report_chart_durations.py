@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Report how long every Helm chart and Kubernetes manifest took in the latest deployment of an EKS stack.
+
+Usage: python -m scripts.report_chart_durations EKSEnvDev-EKS [--region eu-west-1]
+"""
+import argparse
+import typing
+
+KUBERNETES_RESOURCE_TYPES = (
+    "Custom::AWSCDK-EKS-HelmChart",
+    "Custom::AWSCDK-EKS-KubernetesPatch",
+    "Custom::AWSCDK-EKS-KubernetesResource",
+)
+STACK_OPERATION_START = ("CREATE_IN_PROGRESS", "UPDATE_IN_PROGRESS")
+
+
+def latest_operation_events(cloudformation: typing.Any, stack_name: str) -> typing.List[dict]:
+    events = []
+    # Stack events are returned newest first, stop at the start of the latest stack operation
+    # The nested stacks (like the kubectl provider) emit stack events as well, only the stack's own event counts
+    for page in cloudformation.get_paginator("describe_stack_events").paginate(StackName=stack_name):
+        for event in page["StackEvents"]:
+            events.append(event)
+            if (event["LogicalResourceId"] == event["StackName"]
+                    and event["ResourceStatus"] in STACK_OPERATION_START):
+                return events
+    return events
+
+
+def chart_durations(stack_events: typing.Iterable[dict]) -> typing.Dict[str, float]:
+    """Map the logical id of every chart/manifest to its deploy duration in seconds."""
+    started: typing.Dict[str, typing.Any] = {}
+    durations: typing.Dict[str, float] = {}
+    for event in sorted(stack_events, key=lambda e: e["Timestamp"]):
+        if event["ResourceType"] not in KUBERNETES_RESOURCE_TYPES:
+            continue
+        logical_id = event["LogicalResourceId"]
+        status = event["ResourceStatus"]
+        if status.endswith("_IN_PROGRESS") and logical_id not in started:
+            started[logical_id] = event["Timestamp"]
+        elif status.endswith("_COMPLETE") and logical_id in started:
+            durations[logical_id] = (event["Timestamp"] - started[logical_id]).total_seconds()
+    return durations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("stack_name")
+    parser.add_argument("--region", default=None)
+    args = parser.parse_args()
+
+    # boto3 is only needed to run the report, the functions above work with any compatible client
+    import boto3  # pylint: disable=import-outside-toplevel
+
+    cloudformation = boto3.client("cloudformation", region_name=args.region)
+    durations = chart_durations(latest_operation_events(cloudformation, args.stack_name))
+    for logical_id, duration in sorted(durations.items(), key=lambda item: item[1], reverse=True):
+        print("{duration:8.1f}s  {logical_id}".format(duration=duration, logical_id=logical_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,7 @@
 set -o errexit
 set -o verbose
 
-_targets=(network eks app.py deployment.py pipeline.py)
+_targets=(network eks monitoring scripts/report_chart_durations.py app.py deployment.py pipeline.py)
 
 bandit --recursive "${_targets[@]}"
 # black --check --diff "${_targets[@]}"
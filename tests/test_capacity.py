@@ -0,0 +1,117 @@
+import unittest
+
+from eks import capacity
+
+M5_LARGE = capacity.INSTANCE_NETWORK_LIMITS["m5.large"]
+PRIVATE_SUBNETS = ["10.0.0.0/20", "10.0.16.0/20", "10.0.32.0/20"]
+CONTROL_PLANE_SUBNETS = ["10.0.48.0/28", "10.0.48.16/28", "10.0.48.32/28"]
+
+
+class MaxPodsTest(unittest.TestCase):
+
+    def test_secondary_ips(self) -> None:
+        self.assertEqual(capacity.max_pods(M5_LARGE, prefix_delegation=False), 29)
+        self.assertEqual(capacity.max_pods(capacity.INSTANCE_NETWORK_LIMITS["m4.large"], prefix_delegation=False), 20)
+
+    def test_prefix_delegation_is_capped(self) -> None:
+        self.assertEqual(capacity.max_pods(M5_LARGE, prefix_delegation=True), 110)
+
+
+class PeakIpsPerNodeTest(unittest.TestCase):
+
+    def test_secondary_ips(self) -> None:
+        self.assertEqual(capacity.peak_ips_per_node(M5_LARGE, prefix_delegation=False), 30)
+
+    def test_prefix_delegation(self) -> None:
+        # 7 prefixes for 108 pods, one warm prefix and the primary IP of one ENI
+        self.assertEqual(capacity.peak_ips_per_node(M5_LARGE, prefix_delegation=True), 129)
+
+
+class CapacityReportTest(unittest.TestCase):
+
+    def test_default_environment_fits(self) -> None:
+        report = capacity.CapacityReport(
+            nodegroups=[capacity.NodegroupCapacity("od-default-ng", ["m5.large"], 10)],
+            nodegroup_subnet_cidrs=PRIVATE_SUBNETS,
+            control_plane_subnet_cidrs=CONTROL_PLANE_SUBNETS,
+            vpc_endpoint_enis_per_subnet=11,
+        )
+
+        self.assertEqual(report.errors, [])
+        self.assertEqual(report.warnings, [])
+        self.assertEqual(report.max_nodes, 10)
+        self.assertEqual(report.max_enis, 30)
+        self.assertEqual(report.max_ips, 300)
+        self.assertEqual(report.max_pods, 290)
+
+    def test_subnet_shortfall(self) -> None:
+        # 100 nodes x 30 IPs over 3 AZs need 1000 IPs plus the endpoint ENIs in every /24 subnet
+        report = capacity.CapacityReport(
+            nodegroups=[capacity.NodegroupCapacity("od-default-ng", ["m5.large"], 100)],
+            nodegroup_subnet_cidrs=["10.0.0.0/24", "10.0.1.0/24", "10.0.2.0/24"],
+            control_plane_subnet_cidrs=CONTROL_PLANE_SUBNETS,
+            vpc_endpoint_enis_per_subnet=11,
+        )
+
+        self.assertEqual(len(report.errors), 3)
+        self.assertIn("subnet 10.0.0.0/24 has 251 usable IPs, but peak scale needs 1011", report.errors)
+
+    def test_vpc_endpoint_enis_tip_the_subnet(self) -> None:
+        # 24 nodes x 30 IPs over 3 AZs exactly fill a /24 subnet with 11 IPs left for the endpoints
+        nodegroups = [capacity.NodegroupCapacity("od-default-ng", ["m5.large"], 24)]
+        subnets = ["10.0.0.0/24", "10.0.1.0/24", "10.0.2.0/24"]
+
+        fits = capacity.CapacityReport(nodegroups, subnets, CONTROL_PLANE_SUBNETS, vpc_endpoint_enis_per_subnet=11)
+        short = capacity.CapacityReport(nodegroups, subnets, CONTROL_PLANE_SUBNETS, vpc_endpoint_enis_per_subnet=12)
+
+        self.assertEqual(fits.errors, [])
+        self.assertEqual(len(short.errors), 3)
+
+    def test_reserved_ips_tip_the_subnet(self) -> None:
+        nodegroups = [capacity.NodegroupCapacity("od-default-ng", ["m5.large"], 24)]
+        subnets = ["10.0.0.0/24", "10.0.1.0/24", "10.0.2.0/24"]
+
+        report = capacity.CapacityReport(
+            nodegroups, subnets, CONTROL_PLANE_SUBNETS, vpc_endpoint_enis_per_subnet=11, reserved_ips_per_subnet=1)
+
+        self.assertEqual(len(report.errors), 3)
+        self.assertIn("subnet 10.0.0.0/24 has 251 usable IPs, but peak scale needs 252", report.errors)
+
+    def test_prefix_delegation_requires_nitro(self) -> None:
+        report = capacity.CapacityReport(
+            nodegroups=[capacity.NodegroupCapacity("spot-default-ng", ["m5.large", "m4.large"], 10)],
+            nodegroup_subnet_cidrs=PRIVATE_SUBNETS,
+            control_plane_subnet_cidrs=CONTROL_PLANE_SUBNETS,
+            prefix_delegation=True,
+        )
+
+        self.assertEqual(report.errors, ["spot-default-ng: prefix delegation is only supported on Nitro instance types"])
+
+    def test_unknown_instance_types_are_warnings(self) -> None:
+        report = capacity.CapacityReport(
+            nodegroups=[
+                capacity.NodegroupCapacity("od-default-ng", ["m5.large"], 10),
+                capacity.NodegroupCapacity("od-xlarge-ng", ["m5.xlarge"], 10),
+            ],
+            nodegroup_subnet_cidrs=PRIVATE_SUBNETS,
+            control_plane_subnet_cidrs=CONTROL_PLANE_SUBNETS,
+        )
+
+        self.assertEqual(report.errors, [])
+        self.assertEqual(len(report.warnings), 1)
+        self.assertIn("m5.xlarge", report.warnings[0])
+        self.assertEqual(report.max_nodes, 10)
+
+    def test_control_plane_subnet_too_small(self) -> None:
+        report = capacity.CapacityReport(
+            nodegroups=[],
+            nodegroup_subnet_cidrs=PRIVATE_SUBNETS,
+            control_plane_subnet_cidrs=["10.0.48.0/29"],
+        )
+
+        self.assertEqual(len(report.errors), 1)
+        self.assertIn("10.0.48.0/29", report.errors[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
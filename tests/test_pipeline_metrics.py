@@ -0,0 +1,179 @@
+import datetime
+import unittest
+
+from monitoring.pipeline_metrics_handler import index
+
+PIPELINE = "EKSMultiEnvPipeline"
+EXECUTION_ID = "execution-1"
+START = datetime.datetime(2022, 3, 1, 10, 0, 0)
+
+
+def _minutes(minutes: float) -> datetime.datetime:
+    return START + datetime.timedelta(minutes=minutes)
+
+
+def _action_execution(stage: str, action: str, category: str, provider: str, start: float, end: float) -> dict:
+    return {
+        "pipelineExecutionId": EXECUTION_ID,
+        "stageName": stage,
+        "actionName": action,
+        "startTime": _minutes(start),
+        "lastUpdateTime": _minutes(end),
+        "input": {"actionTypeId": {"category": category, "owner": "AWS", "provider": provider, "version": "1"}},
+    }
+
+
+# A pre-production stage that deploys for 20 minutes and waits 5 hours for the manual approval
+ACTION_EXECUTIONS = [
+    _action_execution("EKSMultiEnv-PreProduction", "Network.Prepare", "Deploy", "CloudFormation", 0, 2),
+    _action_execution("EKSMultiEnv-PreProduction", "Network.Deploy", "Deploy", "CloudFormation", 2, 5),
+    _action_execution("EKSMultiEnv-PreProduction", "EKS.Prepare", "Deploy", "CloudFormation", 5, 7),
+    _action_execution("EKSMultiEnv-PreProduction", "EKS.Deploy", "Deploy", "CloudFormation", 7, 20),
+    _action_execution("EKSMultiEnv-PreProduction", "ConfirmPreProdDeploymentSuccessful", "Approval", "Manual", 20,
+                      300),
+    _action_execution("Build", "Synth", "Build", "CodeBuild", -10, -1),
+]
+
+# EKS.Deploy fails after 13 minutes and is retried 100 minutes later
+RETRIED_ACTION_EXECUTIONS = [
+    _action_execution("EKSMultiEnv-PreProduction", "Network.Prepare", "Deploy", "CloudFormation", 0, 2),
+    _action_execution("EKSMultiEnv-PreProduction", "Network.Deploy", "Deploy", "CloudFormation", 2, 5),
+    _action_execution("EKSMultiEnv-PreProduction", "EKS.Prepare", "Deploy", "CloudFormation", 5, 7),
+    _action_execution("EKSMultiEnv-PreProduction", "EKS.Deploy", "Deploy", "CloudFormation", 7, 20),
+    _action_execution("EKSMultiEnv-PreProduction", "EKS.Deploy", "Deploy", "CloudFormation", 120, 130),
+    _action_execution("EKSMultiEnv-PreProduction", "ConfirmPreProdDeploymentSuccessful", "Approval", "Manual", 130,
+                      200),
+]
+
+
+class FakePaginator:
+    def __init__(self, pages: list) -> None:
+        self.pages = pages
+        self.calls = []
+
+    def paginate(self, **kwargs) -> list:
+        self.calls.append(kwargs)
+        return self.pages
+
+
+class FakeCodePipeline:
+    """Stand-in for the boto3 CodePipeline client, serving two pages of every listing."""
+
+    def __init__(self, action_executions: list, pipeline_executions: list) -> None:
+        self.paginators = {
+            "list_action_executions": FakePaginator([
+                {"actionExecutionDetails": action_executions[:2]},
+                {"actionExecutionDetails": action_executions[2:]},
+            ]),
+            "list_pipeline_executions": FakePaginator([
+                {"pipelineExecutionSummaries": pipeline_executions[:1]},
+                {"pipelineExecutionSummaries": pipeline_executions[1:]},
+            ]),
+        }
+
+    def get_paginator(self, operation_name: str) -> FakePaginator:
+        return self.paginators[operation_name]
+
+
+class FakeCloudWatch:
+    def __init__(self) -> None:
+        self.put_metric_data_calls = []
+
+    def put_metric_data(self, **kwargs) -> None:
+        self.put_metric_data_calls.append(kwargs)
+
+
+def _event(detail_type: str, state: str, **detail: str) -> dict:
+    return {
+        "source": "aws.codepipeline",
+        "detail-type": detail_type,
+        "detail": dict(detail, pipeline=PIPELINE, state=state, **{"execution-id": EXECUTION_ID}),
+    }
+
+
+class PublishMetricsTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.codepipeline = FakeCodePipeline(
+            ACTION_EXECUTIONS,
+            [
+                {"pipelineExecutionId": "execution-0", "startTime": _minutes(-60), "lastUpdateTime": _minutes(-30)},
+                {"pipelineExecutionId": EXECUTION_ID, "startTime": _minutes(-10), "lastUpdateTime": _minutes(320)},
+            ],
+        )
+        self.cloudwatch = FakeCloudWatch()
+
+    def _publish(self, event: dict) -> dict:
+        index.publish_metrics(event, self.codepipeline, self.cloudwatch)
+        self.assertEqual(len(self.cloudwatch.put_metric_data_calls), 1)
+        call = self.cloudwatch.put_metric_data_calls[0]
+        self.assertEqual(call["Namespace"], index.NAMESPACE)
+        return {metric["MetricName"]: metric for metric in call["MetricData"]}
+
+    def test_stage_deploy_duration_excludes_manual_approval(self) -> None:
+        metrics = self._publish(
+            _event(index.STAGE_EVENT, "SUCCEEDED", stage="EKSMultiEnv-PreProduction"))
+
+        self.assertEqual(metrics["StageDuration"]["Value"], 300 * 60)
+        self.assertEqual(metrics["StageDeployDuration"]["Value"], 20 * 60)
+        self.assertEqual(metrics["StageFailed"]["Value"], 0)
+        self.assertEqual(metrics["StageDeployDuration"]["Dimensions"], [
+            {"Name": "Pipeline", "Value": PIPELINE},
+            {"Name": "Stage", "Value": "EKSMultiEnv-PreProduction"},
+        ])
+        self.assertEqual(
+            self.codepipeline.paginators["list_action_executions"].calls,
+            [{"pipelineName": PIPELINE, "filter": {"pipelineExecutionId": EXECUTION_ID}}],
+        )
+
+    def test_failed_action(self) -> None:
+        metrics = self._publish(
+            _event(index.ACTION_EVENT, "FAILED", stage="EKSMultiEnv-PreProduction", action="EKS.Deploy"))
+
+        self.assertEqual(set(metrics), {"ActionFailed", "ActionDuration"})
+        self.assertEqual(metrics["ActionFailed"]["Value"], 1)
+        self.assertEqual(metrics["ActionDuration"]["Value"], 13 * 60)
+        self.assertEqual(metrics["ActionDuration"]["Unit"], "Seconds")
+
+    def test_retried_action_excludes_earlier_attempts(self) -> None:
+        self.codepipeline = FakeCodePipeline(RETRIED_ACTION_EXECUTIONS, [])
+
+        stage_metrics = self._publish(
+            _event(index.STAGE_EVENT, "SUCCEEDED", stage="EKSMultiEnv-PreProduction"))
+        self.cloudwatch.put_metric_data_calls.clear()
+        action_metrics = self._publish(
+            _event(index.ACTION_EVENT, "SUCCEEDED", stage="EKSMultiEnv-PreProduction", action="EKS.Deploy"))
+
+        self.assertEqual(action_metrics["ActionDuration"]["Value"], 10 * 60)
+        self.assertEqual(stage_metrics["StageDeployDuration"]["Value"], 10 * 60)
+        self.assertEqual(stage_metrics["StageDuration"]["Value"], 80 * 60)
+
+    def test_pipeline_execution(self) -> None:
+        metrics = self._publish(_event(index.PIPELINE_EVENT, "SUCCEEDED"))
+
+        self.assertEqual(metrics["PipelineDuration"]["Value"], 330 * 60)
+        self.assertEqual(metrics["PipelineFailed"]["Value"], 0)
+
+    def test_interrupted_executions_have_own_metric(self) -> None:
+        for state in index.INTERRUPTED_STATES:
+            with self.subTest(state=state):
+                self.cloudwatch.put_metric_data_calls.clear()
+                metrics = self._publish(
+                    _event(index.STAGE_EVENT, state, stage="EKSMultiEnv-PreProduction"))
+
+                self.assertEqual(set(metrics), {"StageInterrupted"})
+                self.assertEqual(metrics["StageInterrupted"]["Value"], 1)
+
+    def test_started_executions_are_ignored(self) -> None:
+        metric_data = index.publish_metrics(
+            _event(index.STAGE_EVENT, "STARTED", stage="EKSMultiEnv-PreProduction"),
+            self.codepipeline,
+            self.cloudwatch,
+        )
+
+        self.assertEqual(metric_data, [])
+        self.assertEqual(self.cloudwatch.put_metric_data_calls, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import datetime
+import unittest
+
+from scripts import report_chart_durations
+
+STACK_NAME = "EKSEnvDev-EKS"
+START = datetime.datetime(2022, 3, 1, 10, 0, 0)
+
+
+def _seconds(seconds: float) -> datetime.datetime:
+    return START + datetime.timedelta(seconds=seconds)
+
+
+def _event(logical_id: str, resource_type: str, status: str, seconds: float) -> dict:
+    return {
+        "StackName": STACK_NAME,
+        "LogicalResourceId": logical_id,
+        "ResourceType": resource_type,
+        "ResourceStatus": status,
+        "Timestamp": _seconds(seconds),
+    }
+
+
+class FakePaginator:
+    def __init__(self, pages: list) -> None:
+        self.pages = pages
+
+    def paginate(self, **_kwargs: str) -> list:
+        return self.pages
+
+
+class FakeCloudFormation:
+    def __init__(self, events: list) -> None:
+        # Stack events are returned newest first, two per page
+        newest_first = sorted(events, key=lambda event: event["Timestamp"], reverse=True)
+        self.pages = [
+            {"StackEvents": newest_first[index:index + 2]} for index in range(0, len(newest_first), 2)
+        ]
+
+    def get_paginator(self, operation: str) -> FakePaginator:
+        assert operation == "describe_stack_events"
+        return FakePaginator(self.pages)
+
+
+PREVIOUS_DEPLOYMENT = [
+    _event(STACK_NAME, "AWS::CloudFormation::Stack", "UPDATE_IN_PROGRESS", -600),
+    _event("ClusterAutoscalerChart", "Custom::AWSCDK-EKS-HelmChart", "UPDATE_IN_PROGRESS", -590),
+    _event("ClusterAutoscalerChart", "Custom::AWSCDK-EKS-HelmChart", "UPDATE_COMPLETE", -500),
+    _event(STACK_NAME, "AWS::CloudFormation::Stack", "UPDATE_COMPLETE", -490),
+]
+LATEST_DEPLOYMENT = [
+    _event(STACK_NAME, "AWS::CloudFormation::Stack", "UPDATE_IN_PROGRESS", 0),
+    _event("KubectlProviderNestedStack", "AWS::CloudFormation::Stack", "UPDATE_IN_PROGRESS", 5),
+    _event("KubectlProviderNestedStack", "AWS::CloudFormation::Stack", "UPDATE_COMPLETE", 60),
+    _event("AwsLbControllerChart", "Custom::AWSCDK-EKS-HelmChart", "UPDATE_IN_PROGRESS", 70),
+    _event("Gp2NotDefaultPatch", "Custom::AWSCDK-EKS-KubernetesPatch", "UPDATE_IN_PROGRESS", 75),
+    _event("Gp2NotDefaultPatch", "Custom::AWSCDK-EKS-KubernetesPatch", "UPDATE_COMPLETE", 85),
+    _event("AwsLbControllerChart", "Custom::AWSCDK-EKS-HelmChart", "UPDATE_COMPLETE", 190),
+    _event("EbsCsiDriverRole", "AWS::IAM::Role", "UPDATE_IN_PROGRESS", 200),
+    _event("EbsCsiDriverRole", "AWS::IAM::Role", "UPDATE_COMPLETE", 230),
+    _event(STACK_NAME, "AWS::CloudFormation::Stack", "UPDATE_COMPLETE", 240),
+]
+
+
+class LatestOperationEventsTest(unittest.TestCase):
+
+    def test_stops_at_the_start_of_the_stack_operation(self) -> None:
+        cloudformation = FakeCloudFormation(PREVIOUS_DEPLOYMENT + LATEST_DEPLOYMENT)
+
+        events = report_chart_durations.latest_operation_events(cloudformation, STACK_NAME)
+
+        # The nested stack's UPDATE_IN_PROGRESS event doesn't end the operation early
+        self.assertEqual(len(events), len(LATEST_DEPLOYMENT))
+        self.assertEqual(events[-1], LATEST_DEPLOYMENT[0])
+
+    def test_first_deployment(self) -> None:
+        cloudformation = FakeCloudFormation(LATEST_DEPLOYMENT[1:])
+
+        events = report_chart_durations.latest_operation_events(cloudformation, STACK_NAME)
+
+        self.assertEqual(len(events), len(LATEST_DEPLOYMENT) - 1)
+
+
+class ChartDurationsTest(unittest.TestCase):
+
+    def test_kubernetes_resources_only(self) -> None:
+        durations = report_chart_durations.chart_durations(LATEST_DEPLOYMENT)
+
+        self.assertEqual(durations, {"AwsLbControllerChart": 120.0, "Gp2NotDefaultPatch": 10.0})
+
+    def test_in_progress_resources_are_left_out(self) -> None:
+        durations = report_chart_durations.chart_durations(LATEST_DEPLOYMENT[:5])
+
+        self.assertEqual(durations, {})
+
+
+if __name__ == "__main__":
+    unittest.main()